@@ -3,18 +3,27 @@ FastAPI Backend for AI Feedback System
 Handles review submissions, AI processing, and admin data retrieval
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List, Tuple
-from datetime import datetime
+from typing import Optional, List, Tuple, Any
+from collections import OrderedDict, Counter
+from datetime import datetime, timezone
 import sqlite3
+import aiosqlite
 import os
 import json
+import asyncio
 import time
+import random
 import logging
+import hashlib
+import re
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from openai import OpenAI
+import openai
+from openai import AsyncOpenAI, DefaultAioHttpClient, RateLimitError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,17 +32,6 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI(title="AI Feedback System API")
-
-# CORS middleware to allow frontend requests
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # Initialize OpenRouter client
 api_key = os.environ.get("OPENROUTER_API_KEY", "")
 if not api_key:
@@ -43,16 +41,86 @@ if not api_key:
     client = None
 else:
     logger.info(f"OpenRouter API key found (length: {len(api_key)}, starts with: {api_key[:10]}...)")
-    client = OpenAI(
+    # aiohttp transport holds up much better than the default httpx one under
+    # concurrent requests; one shared session pools connections for every call.
+    # Keep-alive connections stay warm so calls skip the TCP+TLS handshake.
+    # Limits must come from the HTTP library the SDK is built on, so take the class from its defaults.
+    ConnectionLimits = type(openai.DEFAULT_CONNECTION_LIMITS)
+    client = AsyncOpenAI(
         api_key=api_key,
-        base_url="https://openrouter.ai/api/v1"
+        base_url="https://openrouter.ai/api/v1",
+        timeout=openai.Timeout(30.0, connect=5.0),
+        # _call_with_retry is the only retry policy; SDK retries would multiply its attempts
+        max_retries=0,
+        http_client=DefaultAioHttpClient(
+            limits=ConnectionLimits(
+                max_connections=200,
+                max_keepalive_connections=100,
+                keepalive_expiry=60
+            )
+        )
     )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: open the database and optional caches, release shared clients on shutdown"""
+    global db
+    # init_db uses the blocking sqlite3 driver, so keep it off the event loop
+    await asyncio.to_thread(init_db)
+    db = await open_db()
+    if semantic_cache:
+        await semantic_cache.start()
+    if predict_batcher:
+        await predict_batcher.start()
+    yield
+    if predict_batcher:
+        await predict_batcher.stop()
+    await db.execute("PRAGMA optimize")
+    await db.close()
+    if client:
+        await client.close()
+        logger.info("OpenRouter client closed")
+    await llm_cache.close()
+
+app = FastAPI(title="AI Feedback System API", lifespan=lifespan)
+
+# CORS middleware to allow frontend requests
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # In production, specify exact origins
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
 # Database setup
 DB_PATH = "feedback.db"
 
+# Long-lived async connection, opened in lifespan and shared by all requests
+db: Optional[aiosqlite.Connection] = None
+
+# Columns returned to clients, in response order
+SUBMISSION_COLUMNS = ('id', 'rating', 'review_text', 'predicted_rating', 'prediction_explanation',
+                      'ai_response', 'ai_summary', 'ai_recommended_actions', 'created_at')
+
+# Schema is fixed once init_db() has run, so the SELECT is built a single time there
+EXISTING_COLS: frozenset = frozenset()
+SELECT_SQL_PAGE = ""
+
+async def open_db() -> aiosqlite.Connection:
+    """Open the shared connection in WAL mode so reads don't block on writes"""
+    conn = await aiosqlite.connect(DB_PATH)
+    conn.row_factory = aiosqlite.Row
+    await conn.execute("PRAGMA journal_mode=WAL")
+    await conn.execute("PRAGMA synchronous=NORMAL")
+    await conn.execute("PRAGMA busy_timeout=5000")
+    await conn.execute("PRAGMA temp_store=MEMORY")
+    await conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
 def init_db():
     """Initialize SQLite database with migration support"""
+    global EXISTING_COLS, SELECT_SQL_PAGE
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
@@ -90,12 +158,35 @@ def init_db():
         except sqlite3.OperationalError as e:
             logger.warning(f"Could not add prediction_explanation column: {e}")
     
+    # Lets the dashboard's ORDER BY walk the index (backwards) instead of sorting the table.
+    # id breaks ties between rows created in the same second; replaces the created_at-only index.
+    cursor.execute("DROP INDEX IF EXISTS idx_submissions_created_at")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_submissions_created_at_id ON submissions(created_at, id)")
+    # Covers the per-rating GROUP BY counts without touching table rows
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_submissions_rating ON submissions(rating)")
+    
     conn.commit()
+    
+    # PRAGMA optimize does nothing on a connection that has not run queries yet, so gather the
+    # first planner statistics here; the shutdown PRAGMA optimize keeps them current afterwards
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    has_stats = cursor.fetchone() is not None
+    if has_stats:
+        cursor.execute("SELECT 1 FROM sqlite_stat1 WHERE tbl = 'submissions' LIMIT 1")
+        has_stats = cursor.fetchone() is not None
+    if not has_stats:
+        cursor.execute("ANALYZE submissions")
+        conn.commit()
+    
+    # Build SELECT query with only existing columns
+    cursor.execute("PRAGMA table_info(submissions)")
+    EXISTING_COLS = frozenset(col[1] for col in cursor.fetchall())
+    select_columns = ", ".join(col for col in SUBMISSION_COLUMNS if col in EXISTING_COLS)
+    SELECT_SQL_PAGE = f"SELECT {select_columns} FROM submissions ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+    
     conn.close()
     logger.info("Database initialized successfully")
 
-init_db()
-
 # =========================
 # REQUEST/RESPONSE SCHEMAS
 # =========================
@@ -133,15 +224,318 @@ class SubmissionListResponse(BaseModel):
     by_rating: dict
 
 # =========================
-# LLM PROMPT FUNCTIONS
+# LLM RESPONSE CACHE
+# =========================
+
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAXSIZE = int(os.environ.get("LLM_CACHE_MAXSIZE", "1024"))
+# Non-deterministic (temperature > 0) calls are only cached when explicitly enabled
+LLM_CACHE_ALL_TEMPERATURES = os.environ.get("LLM_CACHE_ALL_TEMPERATURES", "").lower() in ("1", "true", "yes")
+REDIS_URL = os.environ.get("REDIS_URL", "")
+
+class MemoryLLMCache:
+    """In-process TTL cache, fine for a single worker"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = asyncio.Lock()
+
+    async def get(self, key: str) -> Optional[dict]:
+        async with self._lock:
+            return self._cache.get(key)
+
+    async def set(self, key: str, value: dict) -> None:
+        async with self._lock:
+            self._cache[key] = value
+
+    async def close(self) -> None:
+        pass
+
+class RedisLLMCache:
+    """Redis-backed cache shared between workers; errors never fail a request"""
+
+    def __init__(self, url: str, ttl: int):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._ttl = ttl
+
+    async def get(self, key: str) -> Optional[dict]:
+        try:
+            value = await self._redis.get(f"llm:{key}")
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            return None
+
+    async def set(self, key: str, value: dict) -> None:
+        try:
+            await self._redis.set(f"llm:{key}", json.dumps(value), ex=self._ttl)
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {e}")
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+if REDIS_URL:
+    logger.info("Using Redis LLM response cache")
+    llm_cache = RedisLLMCache(REDIS_URL, LLM_CACHE_TTL)
+else:
+    llm_cache = MemoryLLMCache(LLM_CACHE_MAXSIZE, LLM_CACHE_TTL)
+
+def llm_cache_key(params: dict) -> Optional[str]:
+    """
+    Exact-match cache key over model, messages, temperature and max_tokens.
+    Returns None when the call should not be cached.
+    """
+    if params["temperature"] > 0 and not LLM_CACHE_ALL_TEMPERATURES:
+        return None
+    key_params = {k: params[k] for k in ("model", "messages", "temperature", "max_tokens")}
+    return hashlib.sha256(json.dumps(key_params, sort_keys=True).encode()).hexdigest()
+
+# Semantic cache: reuse a response generated for a near-identical review.
+# Needs sentence-transformers and faiss-cpu, so it is off unless enabled.
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_MODEL = os.environ.get("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.87"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+class SemanticCache:
+    """
+    Cosine-similarity cache over review embeddings, one FAISS index per namespace.
+    Entries beyond max_entries are evicted least-recently-used first.
+    """
+
+    def __init__(self, model_name: str, threshold: float, max_entries: int):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._model = None
+        self._indexes = {}
+        self._entries = {}
+        self._next_id = 0
+
+    async def start(self) -> None:
+        """Load the embedding model off the event loop"""
+        await asyncio.to_thread(self._load)
+
+    def _load(self) -> None:
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(self.model_name)
+        logger.info(f"Semantic cache loaded embedding model {self.model_name}")
+
+    async def embed(self, text: str) -> Optional[Any]:
+        """Return the L2-normalized embedding of text, or None if unavailable"""
+        if self._model is None:
+            return None
+        try:
+            vector = await asyncio.to_thread(
+                self._model.encode, [text], normalize_embeddings=True, convert_to_numpy=True
+            )
+            return vector.astype("float32")
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+
+    def _index(self, namespace: str):
+        if namespace not in self._indexes:
+            import faiss
+            dim = self._model.get_sentence_embedding_dimension()
+            self._indexes[namespace] = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            self._entries[namespace] = OrderedDict()
+        return self._indexes[namespace], self._entries[namespace]
+
+    def lookup(self, namespace: str, embedding) -> Optional[Any]:
+        index, entries = self._index(namespace)
+        if index.ntotal == 0:
+            return None
+        scores, ids = index.search(embedding, 1)
+        entry_id = int(ids[0][0])
+        if entry_id < 0 or scores[0][0] < self.threshold:
+            return None
+        entries.move_to_end(entry_id)
+        return entries[entry_id]
+
+    def add(self, namespace: str, embedding, value: Any) -> None:
+        import numpy as np
+        index, entries = self._index(namespace)
+        entry_id = self._next_id
+        self._next_id += 1
+        index.add_with_ids(embedding, np.array([entry_id], dtype="int64"))
+        entries[entry_id] = value
+        if len(entries) > self.max_entries:
+            evicted_id, _ = entries.popitem(last=False)
+            index.remove_ids(np.array([evicted_id], dtype="int64"))
+
+semantic_cache = (
+    SemanticCache(SEMANTIC_CACHE_MODEL, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES)
+    if SEMANTIC_CACHE_ENABLED else None
+)
+
+# =========================
+# RATE LIMITING
 # =========================
 
-def predict_rating(review_text: str, retries: int = 3) -> Tuple[Optional[int], Optional[str]]:
+# Provider quota for the whole deployment; 0 leaves that dimension unlimited
+OPENROUTER_RPM = int(os.environ.get("OPENROUTER_RPM", "0"))
+OPENROUTER_TPM = int(os.environ.get("OPENROUTER_TPM", "0"))
+
+# Every worker process keeps its own bucket, so each one enforces an equal share of the quota
+WORKER_COUNT = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+class AsyncTokenBucket:
     """
-    Predict star rating from review text using Task 1's reasoning JSON approach.
-    Returns (predicted_rating, explanation) or (None, None) on failure.
+    Token bucket over requests per minute and tokens per minute.
+    Callers wait for capacity instead of running into 429s from the provider.
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        # A share below one request per minute still needs room for a single request
+        self.request_capacity = max(1.0, rpm)
+        self.request_tokens = self.request_capacity
+        self.token_tokens = float(tpm)
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        if self.rpm:
+            self.request_tokens = min(self.request_capacity, self.request_tokens + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.token_tokens = min(self.tpm, self.token_tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait until one request and estimated_tokens tokens are available, then take them"""
+        if self.tpm:
+            estimated_tokens = min(estimated_tokens, self.tpm)
+        # Holding the lock while sleeping serves waiters in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                wait_time = 0.0
+                if self.rpm and self.request_tokens < 1:
+                    wait_time = max(wait_time, (1 - self.request_tokens) * 60 / self.rpm)
+                if self.tpm and self.token_tokens < estimated_tokens:
+                    wait_time = max(wait_time, (estimated_tokens - self.token_tokens) * 60 / self.tpm)
+                if wait_time <= 0:
+                    break
+                logger.info(f"Rate limiter waiting {wait_time:.2f}s for OpenRouter capacity")
+                await asyncio.sleep(wait_time)
+            if self.rpm:
+                self.request_tokens -= 1
+            if self.tpm:
+                self.token_tokens -= estimated_tokens
+
+llm_limiter = (
+    AsyncTokenBucket(OPENROUTER_RPM / WORKER_COUNT, OPENROUTER_TPM / WORKER_COUNT)
+    if OPENROUTER_RPM or OPENROUTER_TPM else None
+)
+
+async def create_completion(params: dict):
+    """Call chat.completions.create once the rate limiter admits the request"""
+    if llm_limiter:
+        prompt_chars = sum(len(message["content"]) for message in params["messages"])
+        await llm_limiter.acquire(params["max_tokens"] + prompt_chars // 4)
+    return await client.chat.completions.create(**params)
+
+# Longest Retry-After we honour; a user is waiting on /api/submit, so don't hold it open for minutes
+RETRY_AFTER_MAX = 10.0
+
+def _retry_delay(error: Exception, attempt: int, base: float, cap: float) -> float:
+    """Seconds to wait before the next attempt: Retry-After if the provider sent one, else backoff with jitter"""
+    if isinstance(error, RateLimitError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(RETRY_AFTER_MAX, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+    # Jitter keeps concurrent failures from retrying in lockstep
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+async def _call_with_retry(fn, retries: int, label: str, base: float = 0.5, cap: float = 8.0):
+    """
+    Await fn() up to `retries` times with exponential backoff between attempts.
+    Re-raises the last error once all attempts have failed.
+    """
+    for attempt in range(retries):
+        try:
+            logger.info(f"Attempting to {label} (attempt {attempt+1}/{retries})")
+            return await fn()
+        except Exception as e:
+            error_msg = str(e)
+            logger.warning(f"Failed to {label} (attempt {attempt+1}/{retries}): {type(e).__name__}: {error_msg}")
+            if "api" in error_msg.lower() or "key" in error_msg.lower():
+                logger.warning("Possible API key or authentication issue")
+            if attempt == retries - 1:
+                raise
+            await asyncio.sleep(_retry_delay(e, attempt, base, cap))
+
+# =========================
+# REVIEW PREFLIGHT
+# =========================
+
+# Longest review text each task sends to the model; the rest adds tokens but rarely changes the output
+PREDICT_MAX_CHARS = 2000
+RESPONSE_MAX_CHARS = 2000
+SUMMARY_MAX_CHARS = 1200
+ACTIONS_MAX_CHARS = 2000
+ANALYSIS_MAX_CHARS = 2000
+
+# Reported by /api/health
+preflight_stats = Counter()
+
+# A review is readable if it has a run of two letters or any digit (scores like "5/5")
+LOW_SIGNAL_READABLE = re.compile(r"[^\W\d_]{2}|\d")
+
+def truncate_review(review_text: str, max_chars: int, task: str) -> str:
+    """Cut review_text to max_chars for the given task, counting each truncation"""
+    if len(review_text) <= max_chars:
+        return review_text
+    preflight_stats[f"truncated_{task}"] += 1
+    logger.info(f"Truncated review from {len(review_text)} to {max_chars} chars for {task}")
+    return review_text[:max_chars]
+
+def is_low_signal_review(review_text: str) -> bool:
     """
-    prompt = f"""
+    True for reviews with too little readable text to be worth an LLM call.
+    Only clear noise is skipped: no word or number at all ("!!!!"), or a single token that is
+    one short chunk typed over and over ("asdasdasd"). Anything else goes to the model.
+
+    >>> [is_low_signal_review(t) for t in ("Great", "Yummy", "Awful", "Wow", "Ok", "Très bon")]
+    [False, False, False, False, False, False]
+    >>> [is_low_signal_review(t) for t in ("good food good mood", "Good good good", "Bad bad bad!", "ok ok ok ok")]
+    [False, False, False, False]
+    >>> [is_low_signal_review(t) for t in ("Sooooo goood", "Yummmmmmmy!!", "5/5", "10/10")]
+    [False, False, False, False]
+    >>> [is_low_signal_review(t) for t in ("!!!!!!!!", "???", ":-)", "asdasdasd", "aaaa", "x")]
+    [True, True, True, True, True, True]
+    """
+    if not LOW_SIGNAL_READABLE.search(review_text):
+        return True
+    token = review_text.strip().lower()
+    if any(c.isspace() for c in token):
+        return False
+    return any(token == (token[:k] * len(token))[:len(token)] for k in range(1, len(token) // 3 + 1))
+
+# =========================
+# PROMPT TEMPLATES
+# =========================
+
+# Static prompt text is split around the review once at import, so each call only
+# concatenates the review in. Rating-dependent prompts get one (prefix, suffix) per star rating.
+
+def _split_prompt(template: str, rating: Optional[int] = None) -> Tuple[str, str]:
+    """Fill in the rating and split the template around {review_text} into (prefix, suffix)"""
+    if rating is not None:
+        template = template.replace("{rating}", str(rating))
+    prefix, suffix = template.split("{review_text}")
+    return prefix, suffix
+
+PREDICT_PROMPT_TEMPLATE = """
 You are a strict JSON generator.
 
 TASK:
@@ -161,67 +555,41 @@ RULES:
 - Explanation must be ONE short sentence
 
 OUTPUT FORMAT (exact):
-{{"predicted_stars": 4, "explanation": "Short justification"}}
+{"predicted_stars": 4, "explanation": "Short justification"}
 
 Review:
 \"\"\"{review_text}\"\"\"
 """
-    
-    if not client:
-        logger.error("OpenRouter client not initialized - API key missing")
-        return None, None
-    
-    for attempt in range(retries):
-        try:
-            logger.info(f"Attempting to predict rating (attempt {attempt+1}/{retries})")
-            response = client.chat.completions.create(
-                model="openai/gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You output only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0,
-                max_tokens=150
-            )
-            
-            text = response.choices[0].message.content.strip()
-            
-            # Remove markdown code blocks if present
-            if text.startswith("```"):
-                text = text.split("```")[1]
-                if text.startswith("json"):
-                    text = text[4:]
-                text = text.strip()
-            
-            # Parse JSON strictly
-            data = json.loads(text)
-            
-            if (
-                "predicted_stars" in data
-                and "explanation" in data
-                and 1 <= int(data["predicted_stars"]) <= 5
-            ):
-                return int(data["predicted_stars"]), str(data["explanation"])
-            
-            raise ValueError("Invalid JSON schema")
-            
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON decode error (attempt {attempt+1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(1)
-            continue
-        except Exception as e:
-            logger.warning(f"Prediction error (attempt {attempt+1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(1)
-            continue
-    
-    logger.error("Failed to predict rating after all retries")
-    return None, None
+PREDICT_PROMPT_PREFIX, PREDICT_PROMPT_SUFFIX = _split_prompt(PREDICT_PROMPT_TEMPLATE)
+PREDICT_SYSTEM_MESSAGE = {"role": "system", "content": "You output only valid JSON."}
+
+# Batched predictions append the numbered reviews after this prefix
+BATCH_PREDICT_PROMPT_PREFIX = """
+You are a strict JSON generator.
 
-def generate_user_response(rating: int, review_text: str, retries: int = 3) -> str:
-    """Generate a user-facing response based on the review"""
-    prompt = f"""
+TASK:
+Classify each numbered Yelp review below into a star rating from 1 to 5.
+
+Star scale:
+1 = Very negative
+2 = Mostly negative
+3 = Neutral or mixed
+4 = Mostly positive with minor issues
+5 = Extremely positive with no issues
+
+RULES:
+- Return ONLY valid JSON
+- Return exactly one result per review, using the review number as "id"
+- Judge every review independently
+- Explanation must be ONE short sentence
+
+OUTPUT FORMAT (exact):
+{"results": [{"id": 1, "predicted_stars": 4, "explanation": "Short justification"}]}
+
+Reviews:
+"""
+
+USER_RESPONSE_PROMPT_TEMPLATE = """
 You are a warm and professional customer service representative responding to a customer review.
 
 Customer gave us {rating} out of 5 stars.
@@ -238,52 +606,10 @@ Make it sound natural and human, not robotic. Reference specific details from th
 
 Write ONLY the response, nothing else.
 """
-    
-    if not client:
-        logger.error("OpenRouter client not initialized - API key missing")
-        return f"[API Key Not Configured] Thank you for your {rating}-star review. We appreciate your feedback."
-    
-    for attempt in range(retries):
-        try:
-            logger.info(f"Attempting to generate user response (attempt {attempt+1}/{retries})")
-            
-            response = client.chat.completions.create(
-                model="openai/gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a warm, empathetic customer service representative who writes natural, personalized responses."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=250
-            )
-            
-            result = response.choices[0].message.content.strip()
-            if result and len(result) > 20:  # Ensure we got a real response
-                logger.info(f"Successfully generated user response: {result[:100]}...")
-                return result
-            else:
-                logger.warning(f"Received empty or too short response: {result}")
-                raise ValueError(f"Empty or invalid response from API: {result}")
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"User response generation error (attempt {attempt+1}/{retries}): {error_msg}")
-            logger.error(f"Error type: {type(e).__name__}")
-            if "api" in error_msg.lower() or "key" in error_msg.lower():
-                logger.error("Possible API key or authentication issue")
-            if attempt < retries - 1:
-                time.sleep(2)  # Longer wait between retries
-                continue
-    
-    # Fallback if all retries fail
-    logger.error("All user response generation attempts failed, using fallback")
-    logger.error(f"Rating: {rating}, Review length: {len(review_text)}")
-    logger.error(f"API Key present: {bool(os.environ.get('OPENROUTER_API_KEY'))}")
-    # Return a message indicating failure so we know it's not AI-generated
-    return f"[AI Response Generation Failed - Check Logs] Thank you for your {rating}-star review. We appreciate your feedback."
+USER_RESPONSE_PROMPT_PARTS = {rating: _split_prompt(USER_RESPONSE_PROMPT_TEMPLATE, rating) for rating in range(1, 6)}
+USER_RESPONSE_SYSTEM_MESSAGE = {"role": "system", "content": "You are a warm, empathetic customer service representative who writes natural, personalized responses."}
 
-def generate_summary(review_text: str, retries: int = 3) -> str:
-    """Generate a concise summary of the review"""
-    prompt = f"""
+SUMMARY_PROMPT_TEMPLATE = """
 Read this customer review and create a natural, concise one-sentence summary (15-25 words) that captures the main points.
 
 Review: "{review_text}"
@@ -293,49 +619,10 @@ Make it sound natural, not robotic.
 
 Write ONLY the summary sentence, nothing else.
 """
-    
-    for attempt in range(retries):
-        try:
-            logger.info(f"Attempting to generate summary (attempt {attempt+1}/{retries})")
-            logger.info(f"Review text preview: {review_text[:100]}...")
-            
-            response = client.chat.completions.create(
-                model="openai/gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert at creating natural, concise summaries that capture the essence of customer feedback."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=80
-            )
-            
-            result = response.choices[0].message.content.strip()
-            if result and len(result) > 10:  # Ensure we got a real response
-                logger.info(f"Successfully generated summary: {result}")
-                return result
-            else:
-                logger.warning(f"Received empty or too short response: {result}")
-                raise ValueError(f"Empty or invalid response from API: {result}")
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Summary generation error (attempt {attempt+1}/{retries}): {error_msg}")
-            logger.error(f"Error type: {type(e).__name__}")
-            if "api" in error_msg.lower() or "key" in error_msg.lower():
-                logger.error("Possible API key or authentication issue")
-            if attempt < retries - 1:
-                time.sleep(2)  # Longer wait between retries
-                continue
-    
-    # If all retries failed, log detailed error
-    logger.error("All summary generation attempts failed, using fallback")
-    logger.error(f"Review text length: {len(review_text)}")
-    logger.error(f"API Key present: {bool(os.environ.get('OPENROUTER_API_KEY'))}")
-    # Don't use hardcoded fallback - return error message so we know it failed
-    return f"[AI Summary Generation Failed - Check Logs] Review about: {review_text[:50]}..."
+SUMMARY_PROMPT_PREFIX, SUMMARY_PROMPT_SUFFIX = _split_prompt(SUMMARY_PROMPT_TEMPLATE)
+SUMMARY_SYSTEM_MESSAGE = {"role": "system", "content": "You are an expert at creating natural, concise summaries that capture the essence of customer feedback."}
 
-def generate_recommended_actions(rating: int, review_text: str, retries: int = 3) -> str:
-    """Generate recommended actions based on the review"""
-    prompt = f"""
+RECOMMENDED_ACTIONS_PROMPT_TEMPLATE = """
 Analyze this customer review and suggest 2-3 specific, actionable steps the business should take.
 
 Customer Rating: {rating}/5 stars
@@ -352,39 +639,508 @@ Make actions practical and implementable.
 
 Write ONLY the bulleted list, nothing else.
 """
+RECOMMENDED_ACTIONS_PROMPT_PARTS = {rating: _split_prompt(RECOMMENDED_ACTIONS_PROMPT_TEMPLATE, rating) for rating in range(1, 6)}
+RECOMMENDED_ACTIONS_SYSTEM_MESSAGE = {"role": "system", "content": "You are an expert business consultant who provides specific, actionable recommendations based on customer feedback."}
+
+ANALYSIS_PROMPT_TEMPLATE = """
+You are responding to a customer review for a business. Return ONLY a JSON object.
+
+Customer gave us {rating} out of 5 stars.
+Review:
+\"\"\"{review_text}\"\"\"
+
+Fill in these fields:
+
+"response": A warm, professional reply to the customer (2-3 sentences) that:
+- Specifically mentions something from their review (food quality, service, atmosphere, etc.)
+- For a low rating: expresses sincere concern, acknowledges the issues, and offers to make it right
+- For a high rating: thanks them warmly, mentions what they liked, and invites them back
+- For a neutral rating: acknowledges their balanced feedback and shows you value their input
+Make it sound natural and human, not robotic.
+
+"summary": One natural, concise sentence (15-25 words) capturing what they liked/disliked, key issues, and overall sentiment.
+
+"recommended_actions": 2-3 specific, actionable steps for the business as a single string, each on a new line starting with "-".
+- For 4-5 stars: ways to maintain excellence and enhance what they loved
+- For 1-2 stars: concrete steps to address the specific issues mentioned
+- For 3 stars: improvements to move from "okay" to "great"
+
+OUTPUT FORMAT (exact keys):
+{"response": "...", "summary": "...", "recommended_actions": "- ...\\n- ..."}
+"""
+ANALYSIS_PROMPT_PARTS = {rating: _split_prompt(ANALYSIS_PROMPT_TEMPLATE, rating) for rating in range(1, 6)}
+ANALYSIS_SYSTEM_MESSAGE = {"role": "system", "content": "You are a customer feedback analyst. You output only valid JSON."}
+
+# =========================
+# LLM PROMPT FUNCTIONS
+# =========================
+
+# Model per task. The per-field calls default to the combined call's model, so falling back from a
+# failed combined call never changes output quality; point MODEL_SUMMARY/MODEL_ACTIONS at a smaller
+# model (e.g. meta-llama/llama-3.1-8b-instruct) together with LLM_SINGLE_CALL=false to opt in.
+MODEL_ANALYSIS = os.environ.get("MODEL_ANALYSIS", "openai/gpt-3.5-turbo")
+MODEL_TIER = {
+    "predict": os.environ.get("MODEL_PREDICT", "openai/gpt-3.5-turbo"),
+    "response": os.environ.get("MODEL_RESPONSE", MODEL_ANALYSIS),
+    "summary": os.environ.get("MODEL_SUMMARY", MODEL_ANALYSIS),
+    "actions": os.environ.get("MODEL_ACTIONS", MODEL_ANALYSIS),
+    "analysis": MODEL_ANALYSIS,
+}
+
+# Response, summary and actions in one combined call instead of three; set to false to always use the per-field calls.
+# The rating prediction is always its own call so it never sees the customer's star rating.
+LLM_SINGLE_CALL = os.environ.get("LLM_SINGLE_CALL", "true").lower() in ("1", "true", "yes")
+
+# Concurrent rating predictions can share one provider call
+PREDICT_BATCHING = os.environ.get("PREDICT_BATCHING", "").lower() in ("1", "true", "yes")
+PREDICT_BATCH_MAX = int(os.environ.get("PREDICT_BATCH_MAX", "8"))
+PREDICT_BATCH_WINDOW_MS = int(os.environ.get("PREDICT_BATCH_WINDOW_MS", "20"))
+
+async def predict_rating(review_text: str, retries: int = 3, max_chars: int = PREDICT_MAX_CHARS) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Predict star rating from review text using Task 1's reasoning JSON approach.
+    Returns (predicted_rating, explanation) or (None, None) on failure.
+    """
+    review_text = truncate_review(review_text, max_chars, "predict")
+    prompt = PREDICT_PROMPT_PREFIX + review_text + PREDICT_PROMPT_SUFFIX
     
     if not client:
         logger.error("OpenRouter client not initialized - API key missing")
-        return "[API Key Not Configured] - Review feedback internally\n- Follow up with customer if needed"
+        return None, None
     
-    for attempt in range(retries):
-        try:
-            logger.info(f"Attempting to generate recommended actions (attempt {attempt+1}/{retries})")
-            response = client.chat.completions.create(
-                model="openai/gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert business consultant who provides specific, actionable recommendations based on customer feedback."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.6,
-                max_tokens=250
-            )
-            result = response.choices[0].message.content.strip()
-            if result:
-                logger.info(f"Successfully generated recommended actions")
-                return result
-            else:
-                raise ValueError("Empty response from API")
-        except Exception as e:
-            logger.warning(f"Recommended actions generation error (attempt {attempt+1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(1)
+    params = {
+        "model": MODEL_TIER["predict"],
+        "messages": [
+            PREDICT_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0,
+        "max_tokens": 150,
+        "response_format": {"type": "json_object"}
+    }
+    
+    cache_key = llm_cache_key(params)
+    if cache_key:
+        cached = await llm_cache.get(cache_key)
+        if cached:
+            logger.info("Rating prediction served from cache")
+            return cached["predicted_stars"], cached["explanation"]
+    
+    # Share a call with other in-flight predictions; None means predict this review on its own
+    batched = await predict_batcher.predict(review_text) if predict_batcher else None
+    if batched:
+        predicted_stars, explanation = batched
+        if cache_key:
+            await llm_cache.set(cache_key, {"predicted_stars": predicted_stars, "explanation": explanation})
+        return predicted_stars, explanation
+    
+    async def attempt() -> Tuple[int, str]:
+        response = await create_completion(params)
+        
+        # JSON mode guarantees a bare object, so parse strictly
+        data = json.loads(response.choices[0].message.content)
+        
+        if (
+            "predicted_stars" in data
+            and "explanation" in data
+            and 1 <= int(data["predicted_stars"]) <= 5
+        ):
+            return int(data["predicted_stars"]), str(data["explanation"])
+        
+        raise ValueError("Invalid JSON schema")
+    
+    try:
+        predicted_stars, explanation = await _call_with_retry(attempt, retries, "predict rating")
+    except Exception:
+        logger.error("Failed to predict rating after all retries")
+        return None, None
+    
+    if cache_key:
+        await llm_cache.set(cache_key, {"predicted_stars": predicted_stars, "explanation": explanation})
+    return predicted_stars, explanation
+
+async def predict_ratings_batch(review_texts: List[str], retries: int = 2) -> List[Optional[Tuple[int, str]]]:
+    """
+    Predict star ratings for several reviews in one call.
+    Returns one (predicted_rating, explanation) per review, or None where the model gave no valid result.
+    """
+    prompt = BATCH_PREDICT_PROMPT_PREFIX + "".join(
+        f'\nReview {i}:\n"""{text}"""\n' for i, text in enumerate(review_texts, start=1)
+    )
+    params = {
+        "model": MODEL_TIER["predict"],
+        "messages": [
+            PREDICT_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0,
+        "max_tokens": 150 * len(review_texts),
+        "response_format": {"type": "json_object"}
+    }
+    
+    async def attempt() -> List[Optional[Tuple[int, str]]]:
+        response = await create_completion(params)
+        data = json.loads(response.choices[0].message.content)
+        
+        results: List[Optional[Tuple[int, str]]] = [None] * len(review_texts)
+        for item in data["results"]:
+            try:
+                index = int(item["id"]) - 1
+                stars = int(item["predicted_stars"])
+            except (KeyError, TypeError, ValueError):
                 continue
+            if 0 <= index < len(results) and 1 <= stars <= 5 and "explanation" in item:
+                results[index] = (stars, str(item["explanation"]))
+        
+        if not any(results):
+            raise ValueError("Invalid JSON schema")
+        return results
+    
+    try:
+        return await _call_with_retry(attempt, retries, f"predict {len(review_texts)} ratings in one batch")
+    except Exception:
+        logger.error("Batched rating prediction failed, predicting reviews individually")
+        return [None] * len(review_texts)
+
+class PredictBatcher:
+    """
+    Collects rating predictions that arrive within a short window (or until the batch
+    is full) and sends them to the model as one request.
+    """
+
+    def __init__(self, max_batch: int, window_ms: int):
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flushes = set()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for _, future in self._pending:
+            if not future.done():
+                future.set_result(None)
+        self._pending = []
+
+    async def predict(self, review_text: str) -> Optional[Tuple[int, str]]:
+        """Queue a review for the next batch; None means it should be predicted individually"""
+        if self._task is None:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((review_text, future))
+        self._wakeup.set()
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            # Keep collecting until the window closes or the batch is full
+            deadline = loop.time() + self.window
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            if not self._pending:
+                self._wakeup.clear()
+            # Flush in the background so the next batch can start collecting right away
+            flush = asyncio.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        results = [None] * len(batch)
+        try:
+            # A lone review gains nothing from batching and uses the regular single prompt
+            if len(batch) > 1:
+                logger.info(f"Predicting {len(batch)} ratings in one batch")
+                results = await predict_ratings_batch([text for text, _ in batch])
+        finally:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+predict_batcher = PredictBatcher(PREDICT_BATCH_MAX, PREDICT_BATCH_WINDOW_MS) if PREDICT_BATCHING else None
+
+async def generate_user_response(rating: int, review_text: str, retries: int = 3, embedding=None,
+                                 max_chars: int = RESPONSE_MAX_CHARS) -> str:
+    """
+    Generate a user-facing response based on the review.
+    embedding enables the semantic cache lookup for similar reviews.
+    """
+    review_text = truncate_review(review_text, max_chars, "response")
+    prefix, suffix = USER_RESPONSE_PROMPT_PARTS[rating]
+    prompt = prefix + review_text + suffix
+    
+    if not client:
+        logger.error("OpenRouter client not initialized - API key missing")
+        return f"[API Key Not Configured] Thank you for your {rating}-star review. We appreciate your feedback."
+    
+    params = {
+        "model": MODEL_TIER["response"],
+        "messages": [
+            USER_RESPONSE_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.8,
+        "max_tokens": 250
+    }
+    
+    cache_key = llm_cache_key(params)
+    if cache_key:
+        cached = await llm_cache.get(cache_key)
+        if cached:
+            logger.info("User response served from cache")
+            return cached["content"]
+    
+    semantic_namespace = f"user_response:{rating}"
+    if semantic_cache and embedding is not None:
+        cached_content = semantic_cache.lookup(semantic_namespace, embedding)
+        if cached_content:
+            logger.info("User response served from semantic cache")
+            return cached_content
+    
+    async def attempt() -> str:
+        response = await create_completion(params)
+        result = response.choices[0].message.content.strip()
+        if result and len(result) > 20:  # Ensure we got a real response
+            return result
+        logger.warning(f"Received empty or too short response: {result}")
+        raise ValueError(f"Empty or invalid response from API: {result}")
+    
+    try:
+        result = await _call_with_retry(attempt, retries, "generate user response")
+    except Exception:
+        result = None
+    
+    if result:
+        logger.info(f"Successfully generated user response: {result[:100]}...")
+        if cache_key:
+            await llm_cache.set(cache_key, {"content": result})
+        if semantic_cache and embedding is not None:
+            semantic_cache.add(semantic_namespace, embedding, result)
+        return result
+    
+    # Fallback if all retries fail
+    logger.error("All user response generation attempts failed, using fallback")
+    logger.error(f"Rating: {rating}, Review length: {len(review_text)}")
+    logger.error(f"API Key present: {bool(os.environ.get('OPENROUTER_API_KEY'))}")
+    # Return a message indicating failure so we know it's not AI-generated
+    return f"[AI Response Generation Failed - Check Logs] Thank you for your {rating}-star review. We appreciate your feedback."
+
+async def generate_summary(review_text: str, retries: int = 3, embedding=None,
+                           max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    """
+    Generate a concise summary of the review.
+    embedding enables the semantic cache lookup for similar reviews.
+    """
+    review_text = truncate_review(review_text, max_chars, "summary")
+    prompt = SUMMARY_PROMPT_PREFIX + review_text + SUMMARY_PROMPT_SUFFIX
+    
+    params = {
+        "model": MODEL_TIER["summary"],
+        "messages": [
+            SUMMARY_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.5,
+        "max_tokens": 80
+    }
+    
+    cache_key = llm_cache_key(params)
+    if cache_key:
+        cached = await llm_cache.get(cache_key)
+        if cached:
+            logger.info("Summary served from cache")
+            return cached["content"]
+    
+    semantic_namespace = "summary"
+    if semantic_cache and embedding is not None:
+        cached_content = semantic_cache.lookup(semantic_namespace, embedding)
+        if cached_content:
+            logger.info("Summary served from semantic cache")
+            return cached_content
+    
+    logger.info(f"Review text preview: {review_text[:100]}...")
+    
+    async def attempt() -> str:
+        response = await create_completion(params)
+        result = response.choices[0].message.content.strip()
+        if result and len(result) > 10:  # Ensure we got a real response
+            return result
+        logger.warning(f"Received empty or too short response: {result}")
+        raise ValueError(f"Empty or invalid response from API: {result}")
+    
+    try:
+        result = await _call_with_retry(attempt, retries, "generate summary")
+    except Exception:
+        result = None
+    
+    if result:
+        logger.info(f"Successfully generated summary: {result}")
+        if cache_key:
+            await llm_cache.set(cache_key, {"content": result})
+        if semantic_cache and embedding is not None:
+            semantic_cache.add(semantic_namespace, embedding, result)
+        return result
+    
+    # If all retries failed, log detailed error
+    logger.error("All summary generation attempts failed, using fallback")
+    logger.error(f"Review text length: {len(review_text)}")
+    logger.error(f"API Key present: {bool(os.environ.get('OPENROUTER_API_KEY'))}")
+    # Don't use hardcoded fallback - return error message so we know it failed
+    return f"[AI Summary Generation Failed - Check Logs] Review about: {review_text[:50]}..."
+
+async def generate_recommended_actions(rating: int, review_text: str, retries: int = 3, embedding=None,
+                                       max_chars: int = ACTIONS_MAX_CHARS) -> str:
+    """
+    Generate recommended actions based on the review.
+    embedding enables the semantic cache lookup for similar reviews.
+    """
+    review_text = truncate_review(review_text, max_chars, "actions")
+    prefix, suffix = RECOMMENDED_ACTIONS_PROMPT_PARTS[rating]
+    prompt = prefix + review_text + suffix
+    
+    if not client:
+        logger.error("OpenRouter client not initialized - API key missing")
+        return "[API Key Not Configured] - Review feedback internally\n- Follow up with customer if needed"
+    
+    params = {
+        "model": MODEL_TIER["actions"],
+        "messages": [
+            RECOMMENDED_ACTIONS_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.6,
+        "max_tokens": 250
+    }
+    
+    cache_key = llm_cache_key(params)
+    if cache_key:
+        cached = await llm_cache.get(cache_key)
+        if cached:
+            logger.info("Recommended actions served from cache")
+            return cached["content"]
+    
+    semantic_namespace = f"recommended_actions:{rating}"
+    if semantic_cache and embedding is not None:
+        cached_content = semantic_cache.lookup(semantic_namespace, embedding)
+        if cached_content:
+            logger.info("Recommended actions served from semantic cache")
+            return cached_content
+    
+    async def attempt() -> str:
+        response = await create_completion(params)
+        result = response.choices[0].message.content.strip()
+        if result:
+            return result
+        raise ValueError("Empty response from API")
+    
+    try:
+        result = await _call_with_retry(attempt, retries, "generate recommended actions")
+    except Exception:
+        result = None
+    
+    if result:
+        logger.info(f"Successfully generated recommended actions")
+        if cache_key:
+            await llm_cache.set(cache_key, {"content": result})
+        if semantic_cache and embedding is not None:
+            semantic_cache.add(semantic_namespace, embedding, result)
+        return result
     
     # Fallback if all retries fail
     logger.error("All recommended actions generation attempts failed, using fallback")
     return "- Review feedback internally\n- Follow up with customer if needed\n- Implement improvements based on feedback"
 
+async def analyze_review(rating: int, review_text: str, retries: int = 3, embedding=None,
+                         max_chars: int = ANALYSIS_MAX_CHARS) -> Optional[dict]:
+    """
+    Produce the user response, summary and recommended actions in one call.
+    Returns a dict with response, summary and recommended_actions, or None on failure
+    so callers can fall back to the per-field helpers. The rating prediction is left to
+    predict_rating, which only sees the review text.
+    """
+    review_text = truncate_review(review_text, max_chars, "analysis")
+    prefix, suffix = ANALYSIS_PROMPT_PARTS[rating]
+    prompt = prefix + review_text + suffix
+    
+    if not client:
+        logger.error("OpenRouter client not initialized - API key missing")
+        return None
+    
+    params = {
+        "model": MODEL_TIER["analysis"],
+        "messages": [
+            ANALYSIS_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.5,
+        "max_tokens": 600,
+        "response_format": {"type": "json_object"}
+    }
+    
+    cache_key = llm_cache_key(params)
+    if cache_key:
+        cached = await llm_cache.get(cache_key)
+        if cached:
+            logger.info("Review analysis served from cache")
+            return cached
+    
+    semantic_namespace = f"analysis:{rating}"
+    if semantic_cache and embedding is not None:
+        cached_analysis = semantic_cache.lookup(semantic_namespace, embedding)
+        if cached_analysis:
+            logger.info("Review analysis served from semantic cache")
+            return cached_analysis
+    
+    async def attempt() -> dict:
+        response = await create_completion(params)
+        data = json.loads(response.choices[0].message.content)
+        
+        actions = data.get("recommended_actions")
+        if isinstance(actions, list):
+            actions = "\n".join(a if str(a).startswith("-") else f"- {a}" for a in actions)
+        analysis = {
+            "response": str(data["response"]).strip(),
+            "summary": str(data["summary"]).strip(),
+            "recommended_actions": str(actions or "").strip()
+        }
+        if (
+            len(analysis["response"]) > 20
+            and len(analysis["summary"]) > 10
+            and analysis["recommended_actions"]
+        ):
+            return analysis
+        
+        raise ValueError("Invalid JSON schema")
+    
+    try:
+        analysis = await _call_with_retry(attempt, retries, "analyze review")
+    except Exception:
+        logger.error("Combined review analysis failed after all retries")
+        return None
+    
+    if cache_key:
+        await llm_cache.set(cache_key, analysis)
+    if semantic_cache and embedding is not None:
+        semantic_cache.add(semantic_namespace, embedding, analysis)
+    return analysis
+
 # =========================
 # API ENDPOINTS
 # =========================
@@ -403,29 +1159,60 @@ async def submit_review(submission: ReviewSubmission):
                 detail="Server configuration error: API key not configured"
             )
         
-        # Predict rating using Task 1 approach
-        logger.info("Predicting rating for review...")
-        predicted_rating, prediction_explanation = predict_rating(submission.review_text)
+        low_signal = is_low_signal_review(submission.review_text)
         
-        if predicted_rating is None:
-            logger.warning("Rating prediction failed, continuing without prediction")
+        # Embed the review once; the AI helpers share it for semantic cache lookups
+        embedding = None
+        if semantic_cache and not low_signal:
+            embedding = await semantic_cache.embed(submission.review_text)
         
-        # Generate AI responses (with error handling for each)
-        logger.info("Generating AI responses...")
-        # These functions handle their own errors and retries, so we don't need try-except here
-        ai_response = generate_user_response(submission.rating, submission.review_text)
-        ai_summary = generate_summary(submission.review_text)
-        ai_actions = generate_recommended_actions(submission.rating, submission.review_text)
+        if low_signal:
+            # Nothing readable to analyze, so answer without spending LLM calls
+            preflight_stats["skipped_low_signal"] += 1
+            logger.info("Review has too little readable text, skipping AI generation")
+            predicted_rating, prediction_explanation = None, None
+            ai_response = f"Thank you for your {submission.rating}-star review. We appreciate your feedback."
+            ai_summary = "Review did not contain enough readable text to summarize."
+            ai_actions = "- No action needed: review text was not readable"
+        else:
+            # Predict rating (Task 1 approach) and generate AI responses concurrently.
+            # The calls are independent, so total latency is the slowest call rather than the sum.
+            # The prediction is its own temperature-0 call on the review text alone, so the
+            # customer's star rating can't leak into it.
+            # These functions handle their own errors and retries, so we don't need try-except here
+            logger.info("Predicting rating and generating AI responses...")
+            prediction = asyncio.create_task(predict_rating(submission.review_text))
+            
+            # Ask for the response, summary and actions in one call first
+            analysis = None
+            if LLM_SINGLE_CALL:
+                analysis = await analyze_review(submission.rating, submission.review_text, embedding=embedding)
+            
+            if analysis:
+                ai_response = analysis["response"]
+                ai_summary = analysis["summary"]
+                ai_actions = analysis["recommended_actions"]
+            else:
+                ai_response, ai_summary, ai_actions = await asyncio.gather(
+                    generate_user_response(submission.rating, submission.review_text, embedding=embedding),
+                    generate_summary(submission.review_text, embedding=embedding),
+                    generate_recommended_actions(submission.rating, submission.review_text, embedding=embedding),
+                )
+            
+            predicted_rating, prediction_explanation = await prediction
+        
+        if predicted_rating is None and not low_signal:
+            logger.warning("Rating prediction failed, continuing without prediction")
         
         # Store in database
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("""
+            # Same UTC format as the column's CURRENT_TIMESTAMP default, so the response matches the stored row
+            created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            async with db.execute("""
                 INSERT INTO submissions 
                 (rating, review_text, predicted_rating, prediction_explanation, 
-                 ai_response, ai_summary, ai_recommended_actions)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                 ai_response, ai_summary, ai_recommended_actions, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 submission.rating,
                 submission.review_text,
@@ -433,46 +1220,25 @@ async def submit_review(submission: ReviewSubmission):
                 prediction_explanation,
                 ai_response,
                 ai_summary,
-                ai_actions
-            ))
-            
-            submission_id = cursor.lastrowid
-            conn.commit()
-            
-            # Use explicit column names to avoid order issues
-            # Check which columns exist first
-            cursor.execute("PRAGMA table_info(submissions)")
-            columns_info = cursor.fetchall()
-            column_names = [col[1] for col in columns_info]
-            
-            # Build SELECT query with only existing columns
-            select_columns = []
-            for col in ['id', 'rating', 'review_text', 'predicted_rating', 'prediction_explanation',
-                       'ai_response', 'ai_summary', 'ai_recommended_actions', 'created_at']:
-                if col in column_names:
-                    select_columns.append(col)
-            
-            query = f"SELECT {', '.join(select_columns)} FROM submissions WHERE id = ?"
-            cursor.execute(query, (submission_id,))
-            row = cursor.fetchone()
-            conn.close()
+                ai_actions,
+                created_at
+            )) as cursor:
+                submission_id = cursor.lastrowid
+            await db.commit()
             
             logger.info(f"Successfully saved submission {submission_id}")
             
-            # Build a dictionary from column names and values
-            row_dict = dict(zip(select_columns, row))
-            
-            # Build response with explicit column mapping
-            return SubmissionResponse(
-                id=row_dict['id'],
-                rating=row_dict['rating'],
-                review_text=row_dict['review_text'],
-                predicted_rating=row_dict.get('predicted_rating') or predicted_rating,
-                prediction_explanation=row_dict.get('prediction_explanation') or prediction_explanation,
-                ai_response=row_dict.get('ai_response'),
-                ai_summary=row_dict.get('ai_summary'),
-                ai_recommended_actions=row_dict.get('ai_recommended_actions'),
-                created_at=row_dict.get('created_at', datetime.now().isoformat())
+            # Every value is already known here, so no need to read the row back
+            return SubmissionResponse.model_construct(
+                id=submission_id,
+                rating=submission.rating,
+                review_text=submission.review_text,
+                predicted_rating=predicted_rating,
+                prediction_explanation=prediction_explanation,
+                ai_response=ai_response,
+                ai_summary=ai_summary,
+                ai_recommended_actions=ai_actions,
+                created_at=created_at
             )
             
         except sqlite3.Error as e:
@@ -495,55 +1261,31 @@ async def submit_review(submission: ReviewSubmission):
         )
 
 @app.get("/api/submissions", response_model=SubmissionListResponse)
-async def get_submissions():
+async def get_submissions(
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Maximum submissions to return (default: all)"),
+    offset: int = Query(0, ge=0, description="Number of newest submissions to skip")
+):
     """
-    Get all submissions for admin dashboard
+    Get submissions for admin dashboard, newest first.
+    Returns every submission unless limit is given; total and by_rating always cover all of them.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Check which columns exist
-        cursor.execute("PRAGMA table_info(submissions)")
-        columns_info = cursor.fetchall()
-        column_names = [col[1] for col in columns_info]
-        
-        # Build SELECT query with only existing columns
-        select_columns = []
-        for col in ['id', 'rating', 'review_text', 'predicted_rating', 'prediction_explanation',
-                   'ai_response', 'ai_summary', 'ai_recommended_actions', 'created_at']:
-            if col in column_names:
-                select_columns.append(col)
-        
-        query = f"SELECT {', '.join(select_columns)} FROM submissions ORDER BY created_at DESC"
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        conn.close()
-        
-        submissions = []
         by_rating = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        async with db.execute("SELECT rating, COUNT(*) FROM submissions GROUP BY rating") as cursor:
+            for rating, count in await cursor.fetchall():
+                by_rating[rating] = count
         
-        for row in rows:
-            # Build dictionary from column names and values
-            row_dict = dict(zip(select_columns, row))
-            
-            submissions.append(SubmissionResponse(
-                id=row_dict['id'],
-                rating=row_dict['rating'],
-                review_text=row_dict['review_text'],
-                predicted_rating=row_dict.get('predicted_rating'),
-                prediction_explanation=row_dict.get('prediction_explanation'),
-                ai_response=row_dict.get('ai_response'),
-                ai_summary=row_dict.get('ai_summary'),
-                ai_recommended_actions=row_dict.get('ai_recommended_actions'),
-                created_at=row_dict.get('created_at', datetime.now().isoformat())
-            ))
-            by_rating[row_dict['rating']] += 1
+        # LIMIT -1 is SQLite for "no limit"
+        async with db.execute(SELECT_SQL_PAGE, (limit if limit is not None else -1, offset)) as cursor:
+            rows = await cursor.fetchall()
+        
+        # Rows come from our own table, so skip per-field validation
+        submissions = [SubmissionResponse.model_construct(**dict(row)) for row in rows]
         
         logger.info(f"Retrieved {len(submissions)} submissions")
-        return SubmissionListResponse(
+        return SubmissionListResponse.model_construct(
             submissions=submissions,
-            total=len(submissions),
+            total=sum(by_rating.values()),
             by_rating=by_rating
         )
     except sqlite3.Error as e:
@@ -560,7 +1302,8 @@ async def health_check():
     return {
         "status": "healthy", 
         "timestamp": datetime.now().isoformat(),
-        "api_key": api_key_status
+        "api_key": api_key_status,
+        "preflight": dict(preflight_stats)
     }
 
 @app.get("/api/test-ai")
@@ -571,11 +1314,11 @@ async def test_ai():
         
         # Test summary generation
         logger.info("Testing AI summary generation...")
-        summary = generate_summary(test_review, retries=1)
+        summary = await generate_summary(test_review, retries=1)
         
         # Test user response
         logger.info("Testing AI user response generation...")
-        response = generate_user_response(5, test_review, retries=1)
+        response = await generate_user_response(5, test_review, retries=1)
         
         return {
             "status": "success",
@@ -607,4 +1350,15 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Workers need an import string; each one runs the lifespan (and init_db) itself
+    workers = int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+    # Workers read this back to split the OpenRouter quota between them
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 8000)),
+        workers=workers,
+        loop="uvloop",
+        http="httptools"
+    )